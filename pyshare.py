@@ -1,67 +1,40 @@
-import http.server
-import socketserver
-import multiprocessing
 import os
-import netifaces
-import qrcode
-from io import StringIO
+import threading
 from pathlib import Path
 
 from textual.app import App, ComposeResult
 from textual.containers import Grid, Container
 from textual.reactive import reactive
 from textual.screen import ModalScreen
+from textual.timer import Timer
 from textual.widgets import Button, Footer, Header, Static, Label, Input
 
-# --- Server Process ---
-
-def run_server(directory: str, port: int):
-    """Target function to run the HTTP server in a separate process."""
-    class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, directory=directory, **kwargs)
-
-        def log_message(self, format: str, *args) -> None:
-            """Suppress server log messages."""
-            pass
-
-    with socketserver.TCPServer(("", port), QuietHTTPRequestHandler) as httpd:
-        httpd.serve_forever()
+from pyshare_server import FileServer, get_local_ip, make_server, qr_ascii
 
 # --- Utility Functions ---
 
-def get_local_ip() -> str:
+def find_interface_ip() -> str:
     """Finds the most likely local IP address."""
+    import netifaces
+
     try:
-        for iface in netifaces.interfaces():
-            ifaddrs = netifaces.ifaddresses(iface)
-            if netifaces.AF_INET in ifaddrs:
-                for link in ifaddrs[netifaces.AF_INET]:
-                    ip = link.get('addr')
-                    if ip and not ip.startswith('127.'):
-                        return ip
+        return next(
+            (
+                addr
+                for iface in netifaces.interfaces()
+                for link in netifaces.ifaddresses(iface).get(netifaces.AF_INET, ())
+                if (addr := link.get('addr')) and not addr.startswith('127.')
+            ),
+            "?.?.?.?",
+        )
     except Exception:
         return "?.?.?.?"
-    return "?.?.?.?"
 
 def generate_qr_code(url: str) -> str:
     """Generates an ASCII QR code from a URL."""
     if not url:
         return "Server is stopped. Start it to see the QR code."
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=1,
-        border=4,
-    )
-    qr.add_data(url)
-    qr.make(fit=True)
-    
-    # Create an in-memory text stream
-    fake_file = StringIO()
-    qr.print_ascii(out=fake_file)
-    fake_file.seek(0)
-    return fake_file.read()
+    return qr_ascii(url, border=4, error_correction="L")
 
 # --- Modal Dialogs ---
 
@@ -129,11 +102,16 @@ class PyShareApp(App):
 
     # -- Reactive properties that update the UI automatically
     # Use proper type annotations and initial values with reactive(...)
-    server_process: multiprocessing.Process | None = reactive(None)
-    shared_dir: str = reactive(os.getcwd())
+    server_thread: threading.Thread | None = reactive(None)
+    shared_dir: str = reactive("")  # set to the cwd in on_mount
     port: int = reactive(8000)
     url: str = reactive("")
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._httpd: FileServer | None = None
+        self._restart_timer: Timer | None = None
+
     def compose(self) -> ComposeResult:
         yield Header(name="PyShare - Local File Sharer")
         with Container(id="main-container"):
@@ -145,72 +123,93 @@ class PyShareApp(App):
 
     def on_mount(self) -> None:
         """Called when the app is first mounted. Set initial values here."""
+        # Keep references to the widgets the watchers update, so they don't
+        # have to query the DOM on every change.
+        self._status_line = self.query_one("#status-line", Static)
+        self._url_line = self.query_one("#url-line", Static)
+        self._dir_line = self.query_one("#dir-line", Static)
+        self._qr_box = self.query_one("#qr-code-box", Static)
         # Update the UI with initial values now that the DOM is ready.
-        self.query_one("#dir-line").update(f"Serving: {self.shared_dir}")
-        self.query_one("#qr-code-box").update(generate_qr_code(self.url))
+        # Resolving the cwd here rather than at import picks up the directory
+        # the app was actually launched from; watch_shared_dir shows it.
+        self.shared_dir = os.getcwd()
+        self._qr_box.update(generate_qr_code(self.url))
 
     # -- Watch methods for reactive properties
-    def watch_server_process(self, new_process: multiprocessing.Process | None) -> None:
+    def watch_server_thread(self, new_thread: threading.Thread | None) -> None:
         """Update UI based on server status."""
-        status_line = self.query_one("#status-line")
-        url_line = self.query_one("#url-line")
-        qr_box = self.query_one("#qr-code-box")
-
-        if new_process and new_process.is_alive():
-            self.url = f"http://{get_local_ip()}:{self.port}"
-            status_line.update("Status: [b green]Running[/b green]")
-            url_line.update(f"URL: [@click=app.open_url('{self.url}')]{self.url}[/]")
-            qr_box.update(generate_qr_code(self.url))
+        if new_thread and new_thread.is_alive():
+            self.url = f"http://{get_local_ip(find_interface_ip)}:{self.port}"
+            self._status_line.update("Status: [b green]Running[/b green]")
+            self._url_line.update(f"URL: [@click=app.open_url('{self.url}')]{self.url}[/]")
+            self._qr_box.update(generate_qr_code(self.url))
         else:
             self.url = ""
-            status_line.update("Status: [b red]Stopped[/b red]")
-            url_line.update("URL: (stopped)")
-            qr_box.update(generate_qr_code(self.url))
+            self._status_line.update("Status: [b red]Stopped[/b red]")
+            self._url_line.update("URL: (stopped)")
+            self._qr_box.update(generate_qr_code(self.url))
 
     def watch_shared_dir(self, new_dir: str) -> None:
         """Update directory line and restart server if running."""
-        self.query_one("#dir-line").update(f"Serving: {new_dir}")
-        if self.server_process and self.server_process.is_alive():
-            self.action_stop_server()
-            self.action_start_server()
+        self._dir_line.update(f"Serving: {new_dir}")
+        self._schedule_restart()
 
-    def watch_port(self, new_port: int) -> None:
+    def watch_port(self, old_port: int, new_port: int) -> None:
         """Update port and restart server if running."""
-        if self.server_process and self.server_process.is_alive():
+        if new_port == old_port:
+            return
+        self._schedule_restart()
+
+    def _schedule_restart(self) -> None:
+        """Restart the server shortly, so back-to-back changes bounce it once."""
+        if self._restart_timer:
+            self._restart_timer.stop()
+        self._restart_timer = self.set_timer(0.3, self._do_restart)
+
+    def _do_restart(self) -> None:
+        """Restart the server if it is running."""
+        self._restart_timer = None
+        if self.server_thread and self.server_thread.is_alive():
             self.action_stop_server()
             self.action_start_server()
 
     # -- Action methods for key bindings
     def action_start_server(self) -> None:
-        """Start the HTTP server in a background process."""
-        if self.server_process and self.server_process.is_alive():
+        """Start the HTTP server on a background thread."""
+        if self.server_thread and self.server_thread.is_alive():
             return
 
-        proc = multiprocessing.Process(
-            target=run_server, args=(self.shared_dir, self.port)
-        )
-        proc.daemon = True  # ensure it won't block app exit
-        proc.start()
-        self.server_process = proc
+        try:
+            httpd = make_server(self.shared_dir, self.port)
+        except OSError as e:
+            self.notify(f"Could not start server: {e}", severity="error")
+            return
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        self._httpd = httpd
+        self.server_thread = thread
 
     def action_stop_server(self) -> None:
-        """Stop the HTTP server process."""
-        if self.server_process and self.server_process.is_alive():
-            self.server_process.terminate()
-            self.server_process.join()
-            self.server_process = None
+        """Stop the HTTP server thread."""
+        if self.server_thread and self.server_thread.is_alive():
+            self._httpd.stop()
+            self.server_thread.join(timeout=1)
+            self._httpd = None
+            self.server_thread = None
 
     def action_change_dir(self) -> None:
         """Open the directory change dialog."""
-        def on_dialog_dismiss(path: str):
-            self.shared_dir = path
+        def on_dialog_dismiss(path: str | None):
+            if path is not None:
+                self.shared_dir = path
         
         self.push_screen(DirectoryDialog(), on_dialog_dismiss)
 
     def action_change_port(self) -> None:
         """Open the port change dialog."""
-        def on_dialog_dismiss(port: int):
-            self.port = port
+        def on_dialog_dismiss(port: int | None):
+            if port is not None:
+                self.port = port
 
         self.push_screen(PortDialog(), on_dialog_dismiss)
 
@@ -225,7 +224,5 @@ class PyShareApp(App):
 
 
 if __name__ == "__main__":
-    # Ensure multiprocessing works correctly when bundled
-    multiprocessing.freeze_support()
     app = PyShareApp()
     app.run()
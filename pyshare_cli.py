@@ -4,76 +4,50 @@ Minimal, stable CLI for PyShare.
 - Starts server by default
 - Commands: start, stop, dir, port, url, qr, help, quit
 """
-import http.server
-import socketserver
-import multiprocessing
 import os
-import socket
-from io import StringIO
-import qrcode
+import threading
 
-
-def run_server(directory: str, port: int):
-    os.chdir(directory)
-
-    class QuietHandler(http.server.SimpleHTTPRequestHandler):
-        def log_message(self, format: str, *args) -> None:
-            return
-
-    with socketserver.TCPServer(("", port), QuietHandler) as httpd:
-        httpd.serve_forever()
-
-
-def get_local_ip() -> str:
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        return "127.0.0.1"
+from pyshare_server import get_local_ip, make_server, qr_ascii
 
 
 def generate_qr_ascii(url: str) -> str:
     if not url:
         return "(stopped)"
-    qr = qrcode.QRCode(border=1)
-    qr.add_data(url)
-    qr.make(fit=True)
-    f = StringIO()
-    qr.print_ascii(out=f)
-    f.seek(0)
-    return f.read()
+    return qr_ascii(url)
 
 
 class PyShareCLI:
     def __init__(self):
         self.shared_dir = os.getcwd()
         self.port = 8000
-        self.proc = None
+        self.httpd = None
+        self.server_thread = None
         self.url = ""
         self.start_server()
 
     def start_server(self):
-        if self.proc and self.proc.is_alive():
+        if self.server_thread and self.server_thread.is_alive():
             print("Server already running")
             return
-        p = multiprocessing.Process(target=run_server, args=(self.shared_dir, self.port))
-        p.daemon = True
-        p.start()
-        self.proc = p
+        try:
+            self.httpd = make_server(self.shared_dir, self.port)
+        except OSError as e:
+            print(f"Could not start server: {e}")
+            return
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.server_thread.start()
         self.url = f"http://{get_local_ip()}:{self.port}"
         print(f"Started server at {self.url}, serving {self.shared_dir}")
 
     def stop_server(self):
-        if self.proc and self.proc.is_alive():
-            self.proc.terminate()
-            self.proc.join(timeout=1)
+        if self.server_thread and self.server_thread.is_alive():
+            self.httpd.stop()
+            self.server_thread.join(timeout=1)
             print("Server stopped")
         else:
             print("Server is not running")
-        self.proc = None
+        self.httpd = None
+        self.server_thread = None
         self.url = ""
 
     def repl(self):
@@ -101,9 +75,10 @@ class PyShareCLI:
                 else:
                     new = input(f"Enter directory (current: {self.shared_dir}): ")
                 if os.path.isdir(new):
+                    changed = os.path.realpath(new) != os.path.realpath(self.shared_dir)
                     self.shared_dir = new
                     print(f"Serving: {self.shared_dir}")
-                    if self.proc and self.proc.is_alive():
+                    if changed and self.server_thread and self.server_thread.is_alive():
                         self.stop_server()
                         self.start_server()
                 else:
@@ -116,9 +91,10 @@ class PyShareCLI:
                 try:
                     p = int(new)
                     if 1024 <= p <= 65535:
+                        changed = p != self.port
                         self.port = p
                         print(f"Port set to {self.port}")
-                        if self.proc and self.proc.is_alive():
+                        if changed and self.server_thread and self.server_thread.is_alive():
                             self.stop_server()
                             self.start_server()
                     else:
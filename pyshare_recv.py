@@ -1,32 +1,46 @@
 #!/usr/bin/env python3
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from lxml import html as lxml_html
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 
+# Parallel downloads; also the size of the keep-alive connection pool.
+MAX_WORKERS = 8
 
-def list_files(url: str):
-    r = requests.get(url)
+
+def make_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def list_files(session: requests.Session, url: str):
+    r = session.get(url)
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
-    files = []
-    for a in soup.find_all("a"):
-        href = a.get('href')
-        if href and not href.endswith('/'):
-            files.append((a.text.strip(), href))
-    return files
+    # http.server's index page is UTF-8; hand lxml the raw bytes so requests
+    # never has to guess the encoding of the body.
+    tree = lxml_html.fromstring(r.content)
+    return [
+        (a.text_content().strip(), a.get('href'))
+        for a in tree.xpath('//a[@href]')
+        if a.get('href') and not a.get('href').endswith('/')
+    ]
 
 
-def download_file(base: str, href: str, dest: str = '.'):
+def download_file(session: requests.Session, base: str, href: str, dest: str = '.'):
     url = urljoin(base, href)
     local_name = os.path.basename(urlparse(url).path)
-    r = requests.get(url, stream=True)
-    r.raise_for_status()
     path = os.path.join(dest, local_name)
-    with open(path, 'wb') as f:
-        for chunk in r.iter_content(8192):
-            if chunk:
-                f.write(chunk)
+    with session.get(url, stream=True) as r:
+        r.raise_for_status()
+        r.raw.decode_content = True
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(r.raw, f, length=1 << 20)
     return path
 
 
@@ -35,39 +49,40 @@ def main():
     url = input("Sender base URL (e.g. http://1.2.3.4:8000/): ").strip()
     if not url:
         return
-    try:
-        files = list_files(url)
-    except Exception as e:
-        print("Failed to list files:", e)
-        return
-    if not files:
-        print("No files found at the URL")
-        return
-    print("Files:")
-    for i, (name, href) in enumerate(files, 1):
-        print(f"{i}: {name}")
-    print("Enter numbers separated by space to download, or 'all'")
-    choice = input("> ").strip()
-    to_download = []
-    if choice.lower() == 'all':
-        to_download = files
-    else:
-        idxs = []
-        for part in choice.split():
-            try:
-                idxs.append(int(part) - 1)
-            except Exception:
-                pass
-        for i in idxs:
-            if 0 <= i < len(files):
-                to_download.append(files[i])
-    for name, href in to_download:
-        print(f"Downloading {name}...")
+    with make_session() as session:
         try:
-            path = download_file(url, href)
-            print(f"Saved to {path}")
+            files = list_files(session, url)
         except Exception as e:
-            print(f"Failed to download {name}: {e}")
+            print("Failed to list files:", e)
+            return
+        if not files:
+            print("No files found at the URL")
+            return
+        print("Files:")
+        for i, (name, href) in enumerate(files, 1):
+            print(f"{i}: {name}")
+        print("Enter numbers separated by space to download, or 'all'")
+        choice = input("> ").strip()
+        if choice.lower() == 'all':
+            to_download = files
+        else:
+            idxs = [int(part) - 1 for part in choice.split() if part.isdecimal()]
+            # Drop repeated picks (keeping order): parallel downloads of the
+            # same file would write to the same path at once.
+            to_download = list(dict.fromkeys(files[i] for i in idxs if 0 <= i < len(files)))
+        if not to_download:
+            return
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(to_download))) as ex:
+            jobs = []
+            for name, href in to_download:
+                print(f"Downloading {name}...")
+                jobs.append((name, ex.submit(download_file, session, url, href)))
+            for name, job in jobs:
+                try:
+                    path = job.result()
+                    print(f"Saved to {path}")
+                except Exception as e:
+                    print(f"Failed to download {name}: {e}")
 
 
 if __name__ == '__main__':
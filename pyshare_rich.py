@@ -8,16 +8,14 @@ A lightweight Rich-based TUI for local file sharing.
 
 Run: python pyshare_rich.py
 """
-import http.server
-import socketserver
-import multiprocessing
+import atexit
 import os
-import socket
+import queue
 import sys
-from io import StringIO
+import threading
+from contextlib import contextmanager
 from typing import Optional
 
-import qrcode
 from rich import box
 from rich.align import Align
 from rich.console import Console
@@ -28,77 +26,69 @@ from rich.live import Live
 from rich.text import Text
 from rich.layout import Layout
 
-console = Console()
-
-
-def run_server(directory: str, port: int):
-    """Run a simple HTTP file server serving `directory` on `port`."""
-    os.chdir(directory)
-
-    class QuietHandler(http.server.SimpleHTTPRequestHandler):
-        def log_message(self, format: str, *args) -> None:
-            return
-
-    with socketserver.TCPServer(("", port), QuietHandler) as httpd:
-        httpd.serve_forever()
+from pyshare_server import FileServer, get_local_ip, make_server, qr_ascii
 
-
-def get_local_ip() -> str:
-    """Return a reasonable local IP address or localhost fallback."""
-    try:
-        # connect to an external address (does not send data) to discover outbound IP
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        return "127.0.0.1"
+console = Console()
 
 
 def generate_qr_ascii(url: str) -> str:
     if not url:
         return "Server is stopped. Start it to see the QR code."
-    qr = qrcode.QRCode(border=1)
-    qr.add_data(url)
-    qr.make(fit=True)
-    fake = StringIO()
-    qr.print_ascii(out=fake)
-    fake.seek(0)
-    return fake.read()
+    return qr_ascii(url)
 
 
 class PyShareRich:
     def __init__(self):
         self.shared_dir = os.getcwd()
         self.port = 8000
-        self.server_proc: Optional[multiprocessing.Process] = None
+        self.httpd: Optional[FileServer] = None
+        self.server_thread: Optional[threading.Thread] = None
         self.url = ""
+        # Last rendered panel and the state it was built from
+        self._render_key: Optional[tuple] = None
+        self._render_panel: Optional[Panel] = None
+        # Set when state changed and the display needs a redraw
+        self._dirty = False
+        # Keypresses from the reader thread; the reader waits on _key_done
+        # before reading again so prompts in the main loop own stdin.
+        self._key_q: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._key_done = threading.Event()
+        # Saved terminal settings while stdin is in single-key mode (POSIX tty)
+        self._old_termios: Optional[list] = None
         # Start the server by default
         try:
             self.start_server()
         except Exception:
             # don't crash on startup; leave server stopped
-            self.server_proc = None
+            self.httpd = None
+            self.server_thread = None
 
     def start_server(self):
-        if self.server_proc and self.server_proc.is_alive():
+        if self.server_thread and self.server_thread.is_alive():
             return
-        proc = multiprocessing.Process(target=run_server, args=(self.shared_dir, self.port))
-        proc.daemon = True
-        proc.start()
-        self.server_proc = proc
+        try:
+            self.httpd = make_server(self.shared_dir, self.port)
+        except OSError as e:
+            console.print(f"[red]Could not start server: {e}[/red]")
+            return
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.server_thread.start()
         self.url = f"http://{get_local_ip()}:{self.port}"
+        self._render_key = None
+        self._dirty = True
 
     def stop_server(self):
-        if self.server_proc and self.server_proc.is_alive():
-            self.server_proc.terminate()
-            self.server_proc.join(timeout=1)
-        self.server_proc = None
+        if self.server_thread and self.server_thread.is_alive():
+            self.httpd.stop()
+            self.server_thread.join(timeout=1)
+        self.httpd = None
+        self.server_thread = None
         self.url = ""
+        self._render_key = None
+        self._dirty = True
 
     def toggle_server(self):
-        if self.server_proc and self.server_proc.is_alive():
+        if self.server_thread and self.server_thread.is_alive():
             self.stop_server()
         else:
             self.start_server()
@@ -106,8 +96,12 @@ class PyShareRich:
     def change_dir(self):
         new = console.input(f"Enter directory (current: {self.shared_dir}): ") or self.shared_dir
         if os.path.isdir(new):
+            if os.path.realpath(new) == os.path.realpath(self.shared_dir):
+                return
             self.shared_dir = new
-            if self.server_proc and self.server_proc.is_alive():
+            self._render_key = None
+            self._dirty = True
+            if self.server_thread and self.server_thread.is_alive():
                 self.stop_server()
                 self.start_server()
         else:
@@ -117,9 +111,13 @@ class PyShareRich:
         new = console.input(f"Enter port (current: {self.port}): ") or str(self.port)
         try:
             p = int(new)
+            if p == self.port:
+                return
             if 1024 <= p <= 65535:
                 self.port = p
-                if self.server_proc and self.server_proc.is_alive():
+                self._render_key = None
+                self._dirty = True
+                if self.server_thread and self.server_thread.is_alive():
                     self.stop_server()
                     self.start_server()
             else:
@@ -128,8 +126,13 @@ class PyShareRich:
             console.print("[red]Invalid port[/red]")
 
     def render(self) -> Panel:
+        running = bool(self.server_thread and self.server_thread.is_alive())
+        key = (running, self.url, self.shared_dir)
+        if key == self._render_key:
+            return self._render_panel
+
         table = Table.grid(expand=True)
-        status = "Running" if self.server_proc and self.server_proc.is_alive() else "Stopped"
+        status = "Running" if running else "Stopped"
         status_text = Text(status, style="green" if status=="Running" else "red")
         table.add_row(Text("Status:"), status_text)
         table.add_row(Text("URL:"), Text(self.url or "(stopped)", style="cyan"))
@@ -144,21 +147,48 @@ class PyShareRich:
             Layout(qr_panel, ratio=3),
             Layout(Panel(Text("Commands: [s] Start/Stop  [d] Directory  [p] Port  [q] Quit"), box=box.SIMPLE), ratio=1),
         )
-        return Panel(layout, box=box.ROUNDED)
+        self._render_panel = Panel(layout, box=box.ROUNDED)
+        self._render_key = key
+        return self._render_panel
 
-    def _get_single_key(self) -> str:
-        """Read a single keypress without waiting for Enter (POSIX)."""
-        if os.name == "posix":
-            import tty, termios
+    def _enter_single_key_mode(self):
+        """Switch a POSIX terminal to unbuffered, no-echo input for the session."""
+        if os.name != "posix" or not sys.stdin.isatty():
+            return
+        import tty, termios
 
-            fd = sys.stdin.fileno()
-            old = termios.tcgetattr(fd)
-            try:
-                tty.setraw(fd)
-                ch = sys.stdin.read(1)
-            finally:
-                termios.tcsetattr(fd, termios.TCSADRAIN, old)
-            return ch
+        fd = sys.stdin.fileno()
+        self._old_termios = termios.tcgetattr(fd)
+        # cbreak rather than raw: Live output still needs newline translation
+        tty.setcbreak(fd)
+        atexit.register(self._restore_terminal)
+
+    def _restore_terminal(self):
+        if self._old_termios is not None:
+            import termios
+
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._old_termios)
+
+    @contextmanager
+    def _line_input(self):
+        """Temporarily restore normal line input, e.g. for prompts."""
+        self._restore_terminal()
+        try:
+            yield
+        finally:
+            if self._old_termios is not None:
+                import tty
+
+                tty.setcbreak(sys.stdin.fileno())
+
+    def _get_single_key(self) -> Optional[str]:
+        """Read a single keypress without waiting for Enter (POSIX).
+
+        Returns None once stdin reaches end of input.
+        """
+        if os.name == "posix":
+            # A blocking read only comes back empty at EOF
+            return sys.stdin.read(1) or None
         elif os.name == "nt":
             # Windows single-key
             import msvcrt
@@ -171,36 +201,63 @@ class PyShareRich:
         # Fallback: ask for a line
         return Prompt.ask("Command (s/d/p/q)").strip()
 
+    def _reader_loop(self):
+        """Push keypresses onto the queue, one at a time."""
+        while True:
+            try:
+                key = self._get_single_key()
+            except (EOFError, OSError):
+                key = None
+            self._key_q.put(key)
+            if key is None:
+                return
+            self._key_done.wait()
+            self._key_done.clear()
+
     def run(self):
+        self._enter_single_key_mode()
+        threading.Thread(target=self._reader_loop, daemon=True).start()
         # Use screen=False to avoid switching to the terminal's alternate screen,
         # which can cause flicker and glitches on some terminals.
-        with Live(self.render(), refresh_per_second=4, screen=False) as live:
+        # Redraws are explicit, so there's no need for Live to refresh on a timer.
+        with Live(self.render(), auto_refresh=False, screen=False) as live:
             while True:
                 try:
-                    # Ensure UI is rendered before blocking for input
-                    live.update(self.render())
-                    # Use single-key input so users don't need to press Enter
-                    key = self._get_single_key().strip().lower()
-                    if not key:
-                        live.update(self.render())
+                    try:
+                        key = self._key_q.get(timeout=0.25)
+                    except queue.Empty:
+                        if self._dirty:
+                            self._dirty = False
+                            live.update(self.render(), refresh=True)
                         continue
+                    if key is None:
+                        self.stop_server()
+                        break
+                    key = key.strip().lower()
+                    if key == "q":
+                        self.stop_server()
+                        break
                     if key == "s":
                         self.toggle_server()
                     elif key == "d":
                         # Directory change requires full-line input; pause live
                         live.stop()
-                        self.change_dir()
-                        live.start()
+                        with self._line_input():
+                            self.change_dir()
+                        live.start(refresh=True)
                     elif key == "p":
                         live.stop()
-                        self.change_port()
-                        live.start()
-                    elif key == "q":
-                        self.stop_server()
-                        break
-                    else:
+                        with self._line_input():
+                            self.change_port()
+                        live.start(refresh=True)
+                    elif key:
                         console.print("Unknown command")
-                    live.update(self.render())
+                    # Let the reader have stdin back
+                    self._key_done.set()
+                    if not self._dirty:
+                        continue
+                    self._dirty = False
+                    live.update(self.render(), refresh=True)
                 except (KeyboardInterrupt, EOFError):
                     self.stop_server()
                     break
@@ -0,0 +1,212 @@
+"""
+Server-side helpers shared by the PyShare front ends.
+- Static file handler and threaded HTTP server
+- Local IP lookup
+- ASCII QR rendering
+
+Only the standard library is needed at import time; qrcode is imported on
+first use.
+"""
+import html
+import http.server
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+from functools import lru_cache, partial
+from http import HTTPStatus
+from io import BytesIO
+from typing import Callable
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that doesn't log every request."""
+
+    # Keep connections open between requests so clients (e.g. the receiver's
+    # pooled session) can reuse them; every response sets Content-Length.
+    protocol_version = "HTTP/1.1"
+
+    # Rendered index pages keyed by (directory, request path, directory mtime)
+    _listing_cache: dict[tuple[str, str, int], bytes] = {}
+    _LISTING_CACHE_MAX = 64
+
+    def log_message(self, format: str, *args) -> None:
+        """Suppress server log messages."""
+        return
+
+    def list_directory(self, path):
+        """Serve a directory index, reusing the page until the directory changes."""
+        try:
+            key = (path, self.path, os.stat(path).st_mtime_ns)
+            encoded = self._listing_cache.get(key)
+            if encoded is None:
+                with os.scandir(path) as it:
+                    entries = sorted(it, key=lambda e: e.name.lower())
+                encoded = self._render_listing(entries)
+                if len(self._listing_cache) >= self._LISTING_CACHE_MAX:
+                    self._listing_cache.clear()
+                self._listing_cache[key] = encoded
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "No permission to list directory")
+            return None
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-type", f"text/html; charset={sys.getfilesystemencoding()}")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        return BytesIO(encoded)
+
+    def copyfile(self, source, outputfile):
+        """Send the body with sendfile(2), straight from the page cache, when possible."""
+        if outputfile is not self.wfile:
+            return super().copyfile(source, outputfile)
+        # socket.sendfile falls back to plain send() for in-memory bodies
+        # (e.g. index pages) and on platforms without os.sendfile.
+        self.connection.sendfile(source)
+
+    def _render_listing(self, entries) -> bytes:
+        """Build an index page in the style of SimpleHTTPRequestHandler's."""
+        try:
+            displaypath = urllib.parse.unquote(self.path, errors='surrogatepass')
+        except UnicodeDecodeError:
+            displaypath = urllib.parse.unquote(self.path)
+        displaypath = html.escape(displaypath, quote=False)
+        enc = sys.getfilesystemencoding()
+        title = f'Directory listing for {displaypath}'
+        r = [
+            '<!DOCTYPE HTML>',
+            '<html lang="en">',
+            '<head>',
+            f'<meta charset="{enc}">',
+            f'<title>{title}</title>\n</head>',
+            f'<body>\n<h1>{title}</h1>',
+            '<hr>\n<ul>',
+        ]
+        for entry in entries:
+            # DirEntry caches its type, so this costs no extra stat calls
+            displayname = linkname = entry.name
+            if entry.is_dir():
+                displayname = linkname = entry.name + "/"
+            if entry.is_symlink():
+                displayname = entry.name + "@"
+            r.append('<li><a href="%s">%s</a></li>'
+                     % (urllib.parse.quote(linkname, errors='surrogatepass'),
+                        html.escape(displayname, quote=False)))
+        r.append('</ul>\n<hr>\n</body>\n</html>\n')
+        return '\n'.join(r).encode(enc, 'surrogateescape')
+
+
+class FileServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server that can also cut off connections in progress."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._connections: set[socket.socket] = set()
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._connections_lock:
+            self._connections.add(request)
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request):
+        with self._connections_lock:
+            self._connections.discard(request)
+        super().shutdown_request(request)
+
+    def handle_error(self, request, client_address):
+        # Clients going away mid-transfer, including connections dropped by
+        # stop(), are routine; don't dump a traceback over the UI for them.
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def stop(self) -> None:
+        """Stop accepting, close the listener and drop every open connection.
+
+        Handler threads are daemons and would otherwise keep sending files
+        that were requested before the stop, or sit on idle keep-alive
+        connections.
+        """
+        self.shutdown()
+        self.server_close()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for sock in connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def make_server(directory: str, port: int) -> FileServer:
+    """Bind a threaded HTTP server serving `directory` on `port`.
+
+    The caller runs `serve_forever()` on a background thread and ends it
+    with `stop()`.
+    """
+    return FileServer(("", port), partial(QuietHandler, directory=directory))
+
+
+def outbound_ip() -> str:
+    """Return the address used for outbound traffic, or localhost."""
+    try:
+        # connect to an external address (does not send data) to discover outbound IP
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        return "127.0.0.1"
+
+
+# How long a discovered address is reused before it is looked up again.
+_IP_CACHE_TTL = 30.0
+_IP_CACHE = {"ts": 0.0, "ip": ""}
+
+
+def get_local_ip(lookup: Callable[[], str] = outbound_ip) -> str:
+    """Return the local IP found by `lookup`, reusing a recent result."""
+    if _IP_CACHE["ip"] and time.monotonic() - _IP_CACHE["ts"] < _IP_CACHE_TTL:
+        return _IP_CACHE["ip"]
+    ip = lookup()
+    _IP_CACHE.update(ts=time.monotonic(), ip=ip)
+    return ip
+
+
+# Half-block glyphs indexed by top + 2 * bottom module, as print_ascii draws them
+_QR_GLYPHS = ("\xa0", "\u2580", "\u2584", "\u2588")
+# One reusable QRCode per (border, error correction) combination
+_QR_CODES = {}
+
+
+@lru_cache(maxsize=16)
+def qr_ascii(url: str, border: int = 1, error_correction: str = "M") -> str:
+    """Render `url` as a QR code made of half-block characters.
+
+    `error_correction` is one of qrcode's levels: "L", "M", "Q" or "H".
+    """
+    qr = _QR_CODES.get((border, error_correction))
+    if qr is None:
+        import qrcode
+
+        level = getattr(qrcode.constants, f"ERROR_CORRECT_{error_correction}")
+        qr = _QR_CODES[border, error_correction] = qrcode.QRCode(
+            error_correction=level, box_size=1, border=border
+        )
+    else:
+        qr.clear()
+        # clear() keeps the last version; refit from the smallest each time
+        qr.version = None
+    qr.add_data(url)
+    qr.make(fit=True)
+    # Two matrix rows per line of text
+    rows = qr.get_matrix()
+    if len(rows) % 2:
+        rows.append([False] * len(rows[0]))
+    return "".join(
+        "".join(_QR_GLYPHS[top + 2 * bottom] for top, bottom in zip(rows[i], rows[i + 1])) + "\n"
+        for i in range(0, len(rows), 2)
+    )